@@ -1,3 +1,9 @@
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.dev_aegis import PipelineContext
 # from src.dev_aegis.analyser import SonarAnalyser
 from src.dev_aegis.analyser import SnykAnalyser
 from src.dev_aegis.builder import MavenBuilder
@@ -6,15 +12,66 @@ from src.dev_aegis.vulnerability_fixer import VulnerabilityFixer
 from src.dev_aegis.gitter import MavenDependencyAnalyzer
 
 
+class _StageOutput(io.TextIOBase):
+    """
+    Routes writes to a per-thread buffer while stages run concurrently,
+    so each stage's log can be flushed as one readable block at join time.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self, buffer):
+        self._local.buffer = buffer
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer or self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+
+def _run_concurrently(*stages):
+    """
+    Runs independent pipeline stages in parallel threads and returns their
+    results in order. Output of each stage is printed only after all of them
+    have finished; a stage that exits or fails re-raises here.
+    """
+    buffers = [io.StringIO() for _ in stages]
+    original_stdout = sys.stdout
+    stage_output = _StageOutput(original_stdout)
+
+    def run_stage(stage, buffer):
+        stage_output.capture(buffer)
+        return stage()
+
+    sys.stdout = stage_output
+    try:
+        with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+            futures = [executor.submit(run_stage, stage, buffer) for stage, buffer in zip(stages, buffers)]
+            wait(futures)
+    finally:
+        sys.stdout = original_stdout
+        for buffer in buffers:
+            print(buffer.getvalue(), end='')
+
+    return [future.result() for future in futures]
+
+
 def main():
-    builder = MavenBuilder()
+    context = PipelineContext.from_cwd()
+    builder = MavenBuilder(context)
     builder.build()
-    # sonar_analyser = SonarAnalyser()
-    # sonar_analyser.analyze()
-    snyk_analyser = SnykAnalyser()
-    snyk_analyser.analyze()
+    snyk_analyser = SnykAnalyser(context)
     analyzer = MavenDependencyAnalyzer()
-    print(analyzer.get_project_dependency_tree())
+    # The Snyk scan and the dependency tree resolution are independent, so
+    # they run side by side; the fixer needs both before it can start.
+    # To scan with SonarQube as well, add its analysis as a third stage:
+    #   sonar_analyser = SonarAnalyser(context)
+    #   ... = _run_concurrently(..., sonar_analyser.analyze)
+    _, dependency_tree = _run_concurrently(snyk_analyser.analyze, analyzer.get_project_dependency_tree)
+    print(dependency_tree)
     vulnerability_fixer = VulnerabilityFixer()
     vulnerability_fixer.run()
     git_checker = GitChecker()
@@ -0,0 +1,33 @@
+import functools
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@functools.lru_cache(maxsize=None)
+def ensure_dir(path):
+    """Creates a directory once per process; later calls for the same path are free."""
+    path.mkdir(parents=True, exist_ok=True)
+
+
+@dataclass(frozen=True)
+class PipelineContext:
+    """
+    Holds the paths shared by the pipeline stages, resolved once so each
+    builder and analyser does not recompute them from the working directory.
+    """
+    project_root: Path
+    report_dir: Path
+    log_dir: Path
+
+    @classmethod
+    def from_cwd(cls):
+        """
+        Builds the context for the project in the current working directory.
+        """
+        project_root = Path(os.getcwd()).resolve()
+        return cls(
+            project_root=project_root,
+            report_dir=project_root / ".dev-aegis" / "analyser",
+            log_dir=project_root / ".dev-aegis" / "build",
+        )
@@ -1,3 +1,4 @@
 from . import builder
+from .PipelineContext import PipelineContext
 
-__all__ = ['builder']
+__all__ = ['builder', 'PipelineContext']
@@ -1,8 +1,42 @@
+import io
 import json
+import logging
+import operator
 import os
+import shutil
 import subprocess
 import sys
 
+from ..PipelineContext import PipelineContext, ensure_dir
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Errors raised while decoding Snyk's report, by whichever parser is in use
+# (orjson's JSONDecodeError subclasses the stdlib one).
+_JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError) if ijson else (json.JSONDecodeError,)
+
+# Fetches every field the report needs from a vulnerability in a single call.
+_VULN_FIELDS = operator.itemgetter('packageName', 'severity', 'version', 'fixedIn', 'from', 'url', 'exploit')
+
+# Interned quality-gate values; field values are interned as they are read, so checks are identity compares.
+_CRITICAL = sys.intern('critical')
+_HIGH = sys.intern('high')
+_MATURE = sys.intern('Mature')
+
+# Report labels for Snyk's severities, so rows do not call str.title() per vulnerability.
+_SEVERITY_LABELS = {'low': 'Low', 'medium': 'Medium', 'high': 'High', 'critical': 'Critical'}
+
+
+logger = logging.getLogger(__name__)
+
 
 class SnykAnalyser:
     """
@@ -10,14 +44,16 @@ class SnykAnalyser:
     results for vulnerabilities, generates a report, and checks against
     defined quality gates.
     """
-    def __init__(self):
+    def __init__(self, context=None):
         """
         Initializes the SnykAnalyser, setting up paths for reports.
-        :param project_root: The absolute path to the project directory.
+        :param context: The shared PipelineContext. Defaults to the current working directory.
         """
-        self.project_root = os.getcwd()
-        self.report_dir = os.path.join(self.project_root, ".dev-aegis/analyser")
-        self.report_file = os.path.join(self.report_dir, "snyk-report.md")
+        context = context or PipelineContext.from_cwd()
+        self.project_root = context.project_root
+        self.report_dir = context.report_dir
+        self.report_file = self.report_dir / "snyk-report.md"
+        self._snyk_executable = None
         self._ensure_report_directory_exists()
 
     def _ensure_report_directory_exists(self):
@@ -25,12 +61,23 @@ class SnykAnalyser:
         Creates the report directory if it doesn't already exist.
         """
         try:
-            os.makedirs(self.report_dir, exist_ok=True)
-            print(f"INFO: Report directory '{self.report_dir}' is ready.")
+            ensure_dir(self.report_dir)
+            logger.debug("Report directory '%s' is ready.", self.report_dir)
         except OSError as e:
             print(f"ERROR: Failed to create directory {self.report_dir}: {e}")
             sys.exit(1)
 
+    def _resolve_snyk_executable(self):
+        """
+        Looks up the Snyk CLI on the PATH once and reuses it for later scans.
+        Raises FileNotFoundError if it is not installed.
+        """
+        if self._snyk_executable is None:
+            self._snyk_executable = shutil.which('snyk')
+            if self._snyk_executable is None:
+                raise FileNotFoundError('snyk')
+        return self._snyk_executable
+
     def _run_snyk_command(self):
         """
         Runs the 'snyk test' command with JSON output and handles its execution.
@@ -42,97 +89,117 @@ class SnykAnalyser:
         This function proceeds on 0 or 1, and fails on 2 or 3.
         """
         print("INFO: Starting Snyk vulnerability scan...")
-        command = ['snyk', 'test', '--json']
+        # Pruning repeated subtrees keeps the report small on diamond-shaped Maven graphs,
+        # and --all-projects scans every module of a reactor build in a single run.
+        command = ['snyk', 'test', '--json', '--prune-repeated-subdependencies', '--all-projects']
         print(f"INFO: Executing command: '{' '.join(command)}' in directory: '{self.project_root}'")
 
         try:
-            # We use a file for stdout to handle potentially large JSON outputs.
-            json_output_path = os.path.join(self.report_dir, 'snyk_output.json')
-            with open(json_output_path, 'w') as f_out:
-                result = subprocess.run(
-                    command,
-                    stdout=f_out,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding='utf-8',
-                    cwd=self.project_root
-                )
-
-            # Read the JSON output back from the file
-            with open(json_output_path, 'r') as f_in:
-                snyk_json_output = f_in.read()
+            # Capture the JSON report in memory; json.loads accepts the raw bytes directly.
+            result = subprocess.run(
+                [self._resolve_snyk_executable()] + command[1:],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.project_root
+            )
 
             if result.returncode >= 2:
                 print("\n########################################")
                 print(f"ERROR: Snyk CLI exited with error code {result.returncode}.")
                 print("This may be due to a configuration issue or no supported projects found.")
-                print(f"STDERR:\n{result.stderr}")
+                print(f"STDERR:\n{result.stderr.decode('utf-8', errors='replace')}")
                 print("########################################\n")
                 sys.exit(1)
 
             print("INFO: Snyk scan completed. Parsing results...")
-            return json.loads(snyk_json_output)
+
+            # Keep a copy of the raw output on disk for debugging.
+            (self.report_dir / 'snyk_output.json').write_bytes(result.stdout)
+
+            return result.stdout
 
         except FileNotFoundError:
             print("ERROR: The 'snyk' command was not found.")
             print("Please ensure the Snyk CLI is installed and accessible in your system's PATH.")
             sys.exit(1)
-        except json.JSONDecodeError:
-            print("ERROR: Failed to parse Snyk's JSON output.")
-            print("The scan may not have produced a valid report.")
-            sys.exit(1)
         except Exception as e:
             print(f"ERROR: An unexpected error occurred during the Snyk scan: {e}")
             sys.exit(1)
 
-    def _process_snyk_results(self, snyk_data):
+    def _iter_vulnerabilities(self, snyk_output):
         """
-        Parses the Snyk JSON data, generates a report, and checks quality gates.
+        Yields the vulnerabilities from Snyk's raw JSON output one at a time.
+        With ijson installed the report is stream-parsed, so the full document
+        is never held in memory; otherwise it is decoded in one go, with orjson
+        if available.
         """
-        vulnerabilities_to_report = []
-        quality_gate_failed = False
-        failure_reasons = []
-
-        # Snyk's output can be a single object or a list of objects
+        if ijson is not None:
+            # Snyk's output can be a single object or a list of objects
+            is_list = snyk_output[:64].lstrip()[:1] == b'['
+            prefix = 'item.vulnerabilities.item' if is_list else 'vulnerabilities.item'
+            yield from ijson.items(io.BytesIO(snyk_output), prefix)
+            return
+
+        snyk_data = _json_loads(snyk_output)
         snyk_results = snyk_data if isinstance(snyk_data, list) else [snyk_data]
-
         for project in snyk_results:
-            if project.get('ok', True) is False and 'vulnerabilities' in project:
-                for vuln in project['vulnerabilities']:
+            yield from project.get('vulnerabilities', [])
+
+    def _process_snyk_results(self, snyk_output):
+        """
+        Parses the Snyk JSON output, generates a report, and checks quality gates.
+        """
+        # Report rows are formatted as vulnerabilities are read, so the data is walked only once.
+        report_rows = []
+        add_report_row = report_rows.append
+        quality_gate_failed = False
+        # A set keeps each failure reason once, however many vulnerabilities trigger it.
+        failure_reasons = set()
+
+        try:
+            for vuln in self._iter_vulnerabilities(snyk_output):
+                try:
+                    package, severity, version, fixed_in_list, introduced_list, url, exploit_maturity = _VULN_FIELDS(vuln)
+                except KeyError:
+                    # Fall back to per-field defaults when Snyk omits a field.
                     package = vuln.get('packageName', 'N/A')
                     severity = vuln.get('severity', 'N/A')
                     version = vuln.get('version', 'N/A')
-                    fixed_in = ', '.join(vuln.get('fixedIn', [])) if vuln.get('fixedIn') else 'NA'
-                    introduced_through = '-> '.join(vuln.get('from', [])) if vuln.get('from') else 'NA'
+                    fixed_in_list = vuln.get('fixedIn')
+                    introduced_list = vuln.get('from')
                     url = vuln.get('url', '#')
                     exploit_maturity = vuln.get('exploit', 'Not Available')
+                # Snyk may send null for these; normalise before interning
+                severity = sys.intern((severity or 'N/A').lower())
+                exploit_maturity = sys.intern(exploit_maturity or 'Not Available')
+                fixed_in = ', '.join(fixed_in_list) if fixed_in_list else 'NA'
+                introduced_through = '-> '.join(introduced_list) if introduced_list else 'NA'
+
+                severity_label = _SEVERITY_LABELS.get(severity) or severity.title()
+                add_report_row(
+                    f"| {package} | {severity_label} | {version} | {fixed_in} | {introduced_through} | [View Details]({url}) |\n"
+                )
 
-                    vulnerabilities_to_report.append({
-                        'package': package,
-                        'severity': severity,
-                        'version': version,
-                        'fixed_in': fixed_in,
-                        'introduced_through' : introduced_through,
-                        'url': url
-                    })
-
-                    # Check Quality Gate: Condition 1 (Critical)
-                    if severity == 'critical':
-                        quality_gate_failed = True
-                        failure_reasons.append(f"- CRITICAL vulnerability found in '{package}'.")
+                # Check Quality Gate: Condition 1 (Critical)
+                if severity is _CRITICAL:
+                    quality_gate_failed = True
+                    failure_reasons.add(f"- CRITICAL vulnerability found in '{package}'.")
 
-                    # Check Quality Gate: Condition 2 (High, Fixable, Mature Exploit)
-                    if severity == 'high' and fixed_in != 'NA' and exploit_maturity == 'Mature':
-                        quality_gate_failed = True
-                        failure_reasons.append(f"- HIGH vulnerability with a mature exploit and available fix found in '{package}'.")
+                # Check Quality Gate: Condition 2 (High, Fixable, Mature Exploit)
+                if severity is _HIGH and fixed_in_list and exploit_maturity is _MATURE:
+                    quality_gate_failed = True
+                    failure_reasons.add(f"- HIGH vulnerability with a mature exploit and available fix found in '{package}'.")
+        except _JSON_ERRORS:
+            print("ERROR: Failed to parse Snyk's JSON output.")
+            print("The scan may not have produced a valid report.")
+            sys.exit(1)
 
-        self._generate_report(vulnerabilities_to_report)
+        self._generate_report(report_rows)
 
         if quality_gate_failed:
             print("\n########################################")
             print("ERROR: Snyk Quality Gate FAILED. The code does not meet security standards.")
-            # Use a set to print unique failure reasons
-            for reason in sorted(list(set(failure_reasons))):
+            for reason in sorted(failure_reasons):
                 print(reason)
             print(f"\nPlease review the full Snyk report at: {self.report_file}")
             print("Aborting automation process.")
@@ -143,35 +210,30 @@ class SnykAnalyser:
             print("SUCCESS: Snyk quality gate passed.")
             print("----------------------------------------\n")
 
-    def _generate_report(self, vulnerabilities):
+    def _generate_report(self, report_rows):
         """
-        Generates a markdown report from the list of vulnerabilities.
+        Generates a markdown report from the already formatted vulnerability table rows.
         """
-        if not vulnerabilities:
-            report_content = "# Snyk Security Report\n\nCongratulations! No vulnerabilities were found."
-        else:
-            headers = ["Package", "Severity", "Vulnerable Version", "Fixed in Version", "Introduce Through", "CVE Report Link"]
-            report_content = (
-                f"# Snyk Security Report\n\n"
-                f"Found {len(vulnerabilities)} vulnerabilities.\n\n"
-                f"| {' | '.join(headers)} |\n"
-                f"|{'|'.join(['---'] * len(headers))}|\n"
-            )
-            for vuln in vulnerabilities:
-                link = f"[{vuln['package']}]({vuln['url']})"
-                row = f"| {vuln['package']} | {vuln['severity'].title()} | {vuln['version']} | {vuln['fixed_in']} | {vuln['introduced_through']} | [View Details]({vuln['url']}) |\n"
-                report_content += row
-
         with open(self.report_file, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+            if not report_rows:
+                f.write("# Snyk Security Report\n\nCongratulations! No vulnerabilities were found.")
+            else:
+                headers = ["Package", "Severity", "Vulnerable Version", "Fixed in Version", "Introduce Through", "CVE Report Link"]
+                f.write(
+                    f"# Snyk Security Report\n\n"
+                    f"Found {len(report_rows)} vulnerabilities.\n\n"
+                    f"| {' | '.join(headers)} |\n"
+                    f"|{'|'.join(['---'] * len(headers))}|\n"
+                )
+                f.writelines(report_rows)
         print(f"INFO: Snyk report generated at '{self.report_file}'.")
 
     def analyze(self):
         """
         Public method to orchestrate the entire Snyk analysis process.
         """
-        snyk_data = self._run_snyk_command()
-        self._process_snyk_results(snyk_data)
+        snyk_output = self._run_snyk_command()
+        self._process_snyk_results(snyk_output)
 
 def main():
     """
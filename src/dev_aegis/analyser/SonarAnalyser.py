@@ -1,8 +1,48 @@
+import functools
+import logging
 import os
 import subprocess
 import sys
 import time
-import xml.etree.ElementTree as ET
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..PipelineContext import PipelineContext, ensure_dir
+
+try:
+    from lxml import etree as ET
+    # lxml refuses very deep or large trees by default; multi-module JaCoCo reports can hit that.
+    _ITERPARSE_OPTIONS = {'huge_tree': True}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _ITERPARSE_OPTIONS = {}
+
+# Background task states reported by SonarQube's ce/task endpoint once processing is over.
+_CE_TASK_DONE_STATUSES = ('SUCCESS', 'FAILED', 'CANCELED')
+_CE_TASK_MAX_POLL_INTERVAL = 10
+_CE_TASK_TIMEOUT = 600
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_sonar_properties(path, _mtime):
+    """
+    Reads a '.properties' file into a dict. The file's mtime is part of the
+    cache key, so an unchanged file is only read once per process.
+    """
+    properties = {}
+    with open(path, 'r') as f:
+        content = f.read()
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        key, _, value = line.partition('=')
+        properties[key.strip()] = value.strip()
+    return properties
 
 
 class SonarAnalyser:
@@ -10,16 +50,17 @@ class SonarAnalyser:
     Handles SonarQube analysis by running the scanner, fetching results from the
     server, generating a report, and checking quality gates.
     """
-    def __init__(self):
+    def __init__(self, context=None):
         """
         Initializes the SonarAnalyser, setting up paths and SonarQube properties.
-        :param project_root: The absolute path to the maven project directory.
+        :param context: The shared PipelineContext. Defaults to the current working directory.
         """
-        self.project_root = os.getcwd()
-        self.report_dir = os.path.join(self.project_root, ".dev-aegis/analyser")
-        self.report_file = os.path.join(self.report_dir, "sonar-report.md")
-        self.log_file = os.path.join(self.report_dir, "sonar-scanner.log")
-        self.jacoco_report_path = os.path.join(self.project_root, 'target', 'site', 'jacoco', 'jacoco.xml')
+        context = context or PipelineContext.from_cwd()
+        self.project_root = context.project_root
+        self.report_dir = context.report_dir
+        self.report_file = self.report_dir / "sonar-report.md"
+        self.log_file = self.report_dir / "sonar-scanner.log"
+        self.jacoco_report_path = self.project_root / 'target' / 'site' / 'jacoco' / 'jacoco.xml'
         self._ensure_report_directory_exists()
 
         self.sonarqube_url = None
@@ -27,14 +68,15 @@ class SonarAnalyser:
         # For authentication, set a SONAR_TOKEN environment variable.
         self.sonarqube_token = os.getenv('SONAR_TOKEN')
         self._parse_sonar_properties()
+        self._http = self._create_http_session()
 
     def _ensure_report_directory_exists(self):
         """
         Creates the report directory if it doesn't already exist.
         """
         try:
-            os.makedirs(self.report_dir, exist_ok=True)
-            print(f"INFO: Report directory '{self.report_dir}' is ready.")
+            ensure_dir(self.report_dir)
+            logger.debug("Report directory '%s' is ready.", self.report_dir)
         except OSError as e:
             print(f"ERROR: Failed to create directory {self.report_dir}: {e}")
             sys.exit(1)
@@ -43,18 +85,11 @@ class SonarAnalyser:
         """
         Parses 'sonar-project.properties' to get the server URL and project key.
         """
-        properties_path = os.path.join(self.project_root, 'sonar-project.properties')
+        properties_path = self.project_root / 'sonar-project.properties'
         try:
-            with open(properties_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    key, value = line.split('=', 1)
-                    if key.strip() == 'sonar.host.url':
-                        self.sonarqube_url = value.strip()
-                    elif key.strip() == 'sonar.projectKey':
-                        self.project_key = value.strip()
+            properties = _load_sonar_properties(properties_path, os.stat(properties_path).st_mtime)
+            self.sonarqube_url = properties.get('sonar.host.url')
+            self.project_key = properties.get('sonar.projectKey')
 
             if not self.sonarqube_url or not self.project_key:
                 print("ERROR: 'sonar.host.url' and/or 'sonar.projectKey' not found in sonar-project.properties.")
@@ -67,6 +102,20 @@ class SonarAnalyser:
             print(f"ERROR: Failed to parse sonar-project.properties: {e}")
             sys.exit(1)
 
+    def _create_http_session(self):
+        """
+        Creates a pooled HTTP session for the SonarQube API so connections are
+        reused across calls, retrying transient gateway errors.
+        """
+        session = requests.Session()
+        if self.sonarqube_token:
+            session.auth = (self.sonarqube_token, '')
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     def analyze(self):
         """
         Runs the sonar-scanner command and then processes the results from the server.
@@ -98,11 +147,6 @@ class SonarAnalyser:
                 sys.exit(1)
 
             print("INFO: Sonar Scanner analysis submitted successfully.")
-            # Add a delay to allow the server to process the report. A more robust solution
-            # would be to poll the analysis task endpoint, but a simple wait is often sufficient.
-            wait_time = 15
-            print(f"INFO: Waiting for {wait_time} seconds for SonarQube server to process the analysis...")
-            time.sleep(wait_time)
 
         except FileNotFoundError:
             print("ERROR: The 'sonar-scanner' command was not found.")
@@ -112,27 +156,85 @@ class SonarAnalyser:
             print(f"ERROR: An unexpected error occurred during the scan: {e}")
             sys.exit(1)
 
+        self._wait_for_analysis_task()
         self._process_analysis_results()
 
+    def _read_ce_task_url(self):
+        """
+        Reads the background task URL from the 'report-task.txt' written by the scanner.
+        Returns None if the file or the 'ceTaskUrl' entry is missing.
+        """
+        candidates = [
+            self.project_root / '.scannerwork' / 'report-task.txt',
+            self.project_root / 'target' / 'sonar' / 'report-task.txt',
+        ]
+        for report_task_path in candidates:
+            try:
+                with open(report_task_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        key, _, value = line.partition('=')
+                        if key.strip() == 'ceTaskUrl':
+                            return value.strip()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _wait_for_analysis_task(self):
+        """
+        Polls the SonarQube background task until the server has finished
+        processing the analysis, backing off exponentially between requests.
+        """
+        ce_task_url = self._read_ce_task_url()
+        if not ce_task_url:
+            wait_time = 15
+            print("WARN: Could not find the analysis task URL in 'report-task.txt'.")
+            print(f"INFO: Waiting for {wait_time} seconds for SonarQube server to process the analysis...")
+            time.sleep(wait_time)
+            return
+
+        print("INFO: Waiting for SonarQube server to process the analysis...")
+        delay = 0.5
+        deadline = time.monotonic() + _CE_TASK_TIMEOUT
+        while True:
+            try:
+                response = self._http.get(ce_task_url)
+                response.raise_for_status()
+                status = response.json()['task']['status']
+            except requests.exceptions.RequestException as e:
+                print(f"\nERROR: Failed to query the SonarQube analysis task: {e}")
+                sys.exit(1)
+            except (KeyError, ValueError) as e:
+                print(f"\nERROR: Could not parse SonarQube analysis task response: {e}")
+                sys.exit(1)
+
+            if status in _CE_TASK_DONE_STATUSES:
+                break
+            if time.monotonic() >= deadline:
+                print(f"\nERROR: SonarQube did not finish processing the analysis within {_CE_TASK_TIMEOUT} seconds.")
+                sys.exit(1)
+            time.sleep(delay)
+            delay = min(delay * 2, _CE_TASK_MAX_POLL_INTERVAL)
+
+        if status != 'SUCCESS':
+            print("\n########################################")
+            print(f"ERROR: SonarQube analysis task finished with status '{status}'.")
+            print(f"Please review the task at: {ce_task_url}")
+            print("########################################\n")
+            sys.exit(1)
+        print("INFO: SonarQube server finished processing the analysis.")
+
     def _fetch_bug_counts(self):
         """
         Fetches Blocker and Critical bug counts from the SonarQube server API.
         Returns a tuple of (blocker_bugs, critical_bugs).
         """
-        try:
-            import requests
-        except ImportError:
-            print("\nERROR: The 'requests' library is required for this script. Please install it using: pip install requests\n")
-            sys.exit(1)
-
         metric_keys = "blocker_violations,critical_violations"
         api_url = f"{self.sonarqube_url}/api/measures/component"
         params = {'component': self.project_key, 'metricKeys': metric_keys}
-        auth = (self.sonarqube_token, '') if self.sonarqube_token else None
 
         print("INFO: Querying SonarQube API for bug counts...")
         try:
-            response = requests.get(api_url, params=params, auth=auth)
+            response = self._http.get(api_url, params=params)
             response.raise_for_status()  # Raise an exception for HTTP errors (e.g., 401, 404, 500)
 
             data = response.json()
@@ -160,9 +262,27 @@ class SonarAnalyser:
         """
         print(f"INFO: Attempting to parse JaCoCo report at '{self.jacoco_report_path}'...")
         try:
-            tree = ET.parse(self.jacoco_report_path)
-            root = tree.getroot()
-            instruction_counter = root.find("./counter[@type='INSTRUCTION']")
+            # Stream the report instead of building the whole DOM; only the report-level
+            # INSTRUCTION counter (a direct child of the root element) is needed.
+            instruction_counter = None
+            root = None
+            depth = 0
+            with open(self.jacoco_report_path, 'rb') as f:
+                for event, elem in ET.iterparse(f, events=('start', 'end'), **_ITERPARSE_OPTIONS):
+                    if event == 'start':
+                        if root is None:
+                            root = elem
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if depth == 1:
+                        if elem.tag == 'counter' and elem.get('type') == 'INSTRUCTION':
+                            instruction_counter = elem
+                            break
+                        # Drop the finished subtree so memory stays bounded.
+                        root.clear()
+                    else:
+                        elem.clear()
 
             if instruction_counter is not None:
                 missed = int(instruction_counter.get('missed'))
@@ -1,18 +1,25 @@
-import os
+import logging
 import subprocess
 import sys
 
+from ..PipelineContext import PipelineContext, ensure_dir
+
+logger = logging.getLogger(__name__)
+
 
 class MavenBuilder:
     """
     Handles the Maven build process for a Java project, including logging.
     """
-    def __init__(self):
+    def __init__(self, context=None):
         """
         Initializes the MavenBuilder, setting up the log directory and file paths.
+        :param context: The shared PipelineContext. Defaults to the current working directory.
         """
-        self.log_dir = ".dev-aegis/build"
-        self.log_file = os.path.join(self.log_dir, "build.log")
+        context = context or PipelineContext.from_cwd()
+        self.project_root = context.project_root
+        self.log_dir = context.log_dir
+        self.log_file = self.log_dir / "build.log"
         self._ensure_log_directory_exists()
 
     def _ensure_log_directory_exists(self):
@@ -20,15 +27,15 @@ class MavenBuilder:
         Creates the log directory if it doesn't already exist.
         """
         try:
-            os.makedirs(self.log_dir, exist_ok=True)
-            print(f"INFO: Log directory '{self.log_dir}' is ready.")
+            ensure_dir(self.log_dir)
+            logger.debug("Log directory '%s' is ready.", self.log_dir)
         except OSError as e:
             print(f"ERROR: Failed to create directory {self.log_dir}: {e}")
             sys.exit(1)  # Exit if we can't create the log directory.
 
     def build(self):
         """
-        Runs the 'mvn clean install' command, captures its output, and logs it.
+        Runs the 'mvn clean install' command, streaming its output to the log file.
 
         If the Maven build fails (i.e., exits with a non-zero status code),
         the script will terminate.
@@ -36,34 +43,26 @@ class MavenBuilder:
         print("INFO: Starting Maven build process...")
 
         command = ['mvn', 'clean', 'install']
-        execution_path = os.getcwd()
+        execution_path = self.project_root
         print(f"INFO: Executing command: '{' '.join(command)}' in directory: '{execution_path}'")
 
         try:
             # Execute the Maven command in the directory where the script was called.
-            # - `capture_output=True` captures stdout and stderr.
-            # - `text=True` decodes them as text using the default encoding.
+            # - stdout goes straight to the log file, so the log can be tailed while
+            #   Maven runs and the output is never buffered in memory.
+            # - `stderr=subprocess.STDOUT` interleaves errors into the same log.
             # - `shell=False` (the fix) is safer and passes arguments correctly.
             # - `cwd` ensures the command runs in the correct directory.
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                shell=False,
-                encoding='utf-8',
-                cwd=execution_path
-            )
-
-            # Combine stdout and stderr for a complete log.
-            log_content = (
-                f"--- MAVEN BUILD LOG ---\n\n"
-                f"--- STDOUT ---\n{result.stdout}\n\n"
-                f"--- STDERR ---\n{result.stderr}\n"
-            )
-
-            # Write the captured output to the log file.
             with open(self.log_file, 'w', encoding='utf-8') as f:
-                f.write(log_content)
+                f.write("--- MAVEN BUILD LOG ---\n\n")
+                f.flush()
+                result = subprocess.run(
+                    command,
+                    stdout=f,
+                    stderr=subprocess.STDOUT,
+                    shell=False,
+                    cwd=execution_path
+                )
 
             print(f"INFO: Build logs have been saved to '{self.log_file}'.")
 
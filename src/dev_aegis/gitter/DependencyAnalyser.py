@@ -1,8 +1,31 @@
+import hashlib
+import json
+import logging
 import subprocess
 import os
+import shutil
 import tempfile
 import sys
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Returned by the parser when no tree could be found in Maven's output
+_TREE_PARSE_ERROR = "Could not parse dependency tree. Is 'pom.xml' valid?"
+
+# Successful 'mvn -v' results, keyed by executable path, shared across runs
+_MVN_VERSION_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'dev-aegis', 'mvn-v.json')
+
+# Markers for the start and end of the dependency tree output
+_TREE_START_MARKER = "[INFO] --- dependency"
+_TREE_END_MARKER = "[INFO] ------------------------------------------------------------------------"
+
+_INFO_PREFIX = "[INFO] "
+_INFO_PREFIX_LEN = len(_INFO_PREFIX)
+
+# Directories that never hold reactor modules; hidden directories are skipped too
+_POM_SEARCH_SKIP_DIRS = frozenset({'target', 'node_modules'})
+
 
 class MavenDependencyAnalyzer:
     """
@@ -28,6 +51,16 @@ class MavenDependencyAnalyzer:
                             Defaults to 'mvn', assuming it's in the PATH.
         """
         self.mvn_executable = mvn_executable
+        # Maven is checked on first use, so creating an analyzer stays cheap
+        self._maven_checked = False
+        # project_path -> ((path, mtime_ns, size) of every reactor pom.xml, SHA-1 over their contents)
+        self._pom_cache: Dict[str, Tuple[tuple, str]] = {}
+
+    def _ensure_maven_checked(self) -> None:
+        """Warns once, before the first Maven run, if the mvn executable is unusable."""
+        if self._maven_checked:
+            return
+        self._maven_checked = True
         self_check_result = self._check_maven()
         if not self_check_result["success"]:
             print(
@@ -41,59 +74,217 @@ class MavenDependencyAnalyzer:
             )
 
     def _check_maven(self) -> dict:
-        """Checks if the mvn executable is available."""
+        """
+        Checks if the mvn executable is available. A successful check is cached
+        in '~/.cache/dev-aegis' until the executable is replaced or updated.
+        """
+        exe_path = shutil.which(self.mvn_executable)
+        if exe_path is None:
+            return {"success": False, "error": f"Executable not found: {self.mvn_executable}"}
+
+        cached_versions = {}
+        try:
+            with open(_MVN_VERSION_CACHE, 'r', encoding='utf-8') as f:
+                cached_versions = json.load(f)
+            cached_entry = cached_versions[exe_path]
+            if cached_entry["mtime"] == os.path.getmtime(exe_path):
+                return {"success": True, "output": cached_entry["output"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        if not isinstance(cached_versions, dict):
+            cached_versions = {}
+
         try:
             result = subprocess.run(
-                [self.mvn_executable, '-v'],
+                [exe_path, '-v'],
                 capture_output=True,
                 text=True,
                 check=True,
                 encoding='utf-8'
             )
+            self._write_maven_check(cached_versions, exe_path, result.stdout)
             return {"success": True, "output": result.stdout}
         except FileNotFoundError:
             return {"success": False, "error": f"Executable not found: {self.mvn_executable}"}
         except subprocess.CalledProcessError as e:
             return {"success": False, "error": f"Maven version check failed: {e.stderr}"}
 
+    def _write_maven_check(self, cached_versions: dict, exe_path: str, output: str) -> None:
+        """Records a successful 'mvn -v' for the executable's current mtime."""
+        try:
+            cached_versions[exe_path] = {"mtime": os.path.getmtime(exe_path), "output": output}
+            os.makedirs(os.path.dirname(_MVN_VERSION_CACHE), exist_ok=True)
+            with open(_MVN_VERSION_CACHE, 'w', encoding='utf-8') as f:
+                json.dump(cached_versions, f)
+        except OSError as e:
+            print(f"Warning: Could not cache Maven check: {e}", file=sys.stderr)
+
     def _parse_project_tree_output(self, output: str) -> str:
         """
         Parses the raw `mvn dependency:tree` output to extract
         only the project's dependency tree.
         """
         tree_lines = []
-        capturing = False
-        # Marker for the start of the dependency tree output
-        start_marker = "[INFO] --- dependency"
-        end_marker = "[INFO] ------------------------------------------------------------------------"
-        print(output)
-        for line in output.splitlines():
-            if start_marker in line:
-                capturing = True  # We've found the start of the tree output
-                continue  # Skip this line
-
-            if capturing:
-                if line.startswith(end_marker):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Raw Maven output:\n%s", output)
+        # Skip straight past the build preamble to the line after the start marker.
+        marker_pos = output.find(_TREE_START_MARKER)
+        tree_start = output.find("\n", marker_pos) if marker_pos != -1 else -1
+
+        if tree_start != -1:
+            for line in output[tree_start + 1:].splitlines():
+                if _TREE_START_MARKER in line:
+                    continue  # Another tree header; skip this line
+                if line.startswith(_TREE_END_MARKER):
                     # We've reached the end of the [INFO] block
                     break
-
-                if line.startswith("[INFO] "):
+                if line.startswith(_INFO_PREFIX):
                     # Add the line, but strip the [INFO] prefix
-                    tree_lines.append(line[len("[INFO] "):])
+                    tree_lines.append(line[_INFO_PREFIX_LEN:])
                 elif line.startswith("[WARNING]"):
                     # Include warnings as they can be important
                     tree_lines.append(line)
-                elif not line.startswith("[INFO] BUILD SUCCESS"):
-                     # Reached the end (e.g., BUILD SUCCESS)
-                     break
+                else:
+                    # Reached the end (e.g., BUILD SUCCESS)
+                    break
 
-        print (tree_lines)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Parsed dependency tree lines: %s", tree_lines)
         if not tree_lines:
-            return "Could not parse dependency tree. Is 'pom.xml' valid?"
+            return _TREE_PARSE_ERROR
 
         # The tree_lines list now contains the project GAV and its tree
         return "\n".join(tree_lines)
 
+    def _find_reactor_poms(self, project_path: str) -> List[str]:
+        """
+        Returns every pom.xml under the project, root first and in a stable order,
+        skipping build output and hidden directories.
+        """
+        pom_paths = []
+        for dir_path, dir_names, file_names in os.walk(project_path):
+            dir_names[:] = sorted(
+                name for name in dir_names
+                if name not in _POM_SEARCH_SKIP_DIRS and not name.startswith('.')
+            )
+            if 'pom.xml' in file_names:
+                pom_paths.append(os.path.join(dir_path, 'pom.xml'))
+        return pom_paths
+
+    def _resolve_pom(self, project_path: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the root pom.xml path and a SHA-1 over every pom.xml in the
+        reactor, or None if the project has no readable pom.xml. Module poms
+        usually declare the dependencies, so they are all part of the key. The
+        poms are only re-hashed when one is added, removed or modified.
+        """
+        pom_path = os.path.join(project_path, 'pom.xml')
+        if not os.path.isfile(pom_path):
+            return None  # Not a Maven project; don't walk the directory at all
+        try:
+            pom_paths = self._find_reactor_poms(project_path)
+            if not pom_paths or pom_paths[0] != pom_path:
+                return None
+            signature = tuple(
+                (path, path_stat.st_mtime_ns, path_stat.st_size)
+                for path, path_stat in ((path, os.stat(path)) for path in pom_paths)
+            )
+            cached_pom = self._pom_cache.get(project_path)
+            if cached_pom is not None and cached_pom[0] == signature:
+                return pom_path, cached_pom[1]
+
+            reactor_hash = hashlib.sha1()
+            for path in pom_paths:
+                with open(path, 'rb') as f:
+                    file_hash = hashlib.sha1(f.read()).hexdigest()
+                reactor_hash.update(f"{os.path.relpath(path, project_path)}\0{file_hash}\n".encode('utf-8'))
+        except OSError:
+            return None
+        self._pom_cache[project_path] = (signature, reactor_hash.hexdigest())
+        return pom_path, self._pom_cache[project_path][1]
+
+    def _get_cache_file(self, project_path: str, pom_hash: str, include_filter: Optional[str]) -> str:
+        """
+        Returns the cache file for a tree, keyed by the SHA-1 of the reactor's
+        pom.xml files and the `-Dincludes` filter (if any).
+        """
+        cache_dir = os.path.join(project_path, '.dev-aegis', 'mvn-cache')
+        # Hashed so long batched filters stay within file name limits on every platform
+        filter_key = hashlib.sha1(include_filter.encode('utf-8')).hexdigest() if include_filter else '-'
+        return os.path.join(cache_dir, f"{pom_hash}_{filter_key}.txt")
+
+    def _read_cached_tree(self, cache_file: str) -> Optional[str]:
+        """
+        Returns the cached tree if it exists. The file name already carries the
+        pom.xml contents hash, so an existing entry is never stale.
+        """
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_cached_tree(self, cache_file: str, tree: str) -> None:
+        """Writes a tree to the cache atomically, so readers never see a partial file."""
+        cache_dir = os.path.dirname(cache_file)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(tree)
+                os.replace(tmp_path, cache_file)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Warning: Could not cache dependency tree: {e}", file=sys.stderr)
+
+    def _run_dependency_tree(self, command: list, project_path: str, pom: Tuple[str, str],
+                             include_filter: Optional[str] = None) -> Optional[str]:
+        """
+        Runs a `mvn dependency:tree` command and parses its output. Results are
+        cached under '.dev-aegis/mvn-cache' so an unchanged reactor is resolved only once.
+        """
+        try:
+            _, pom_hash = pom
+            cache_file = self._get_cache_file(project_path, pom_hash, include_filter)
+            cached_tree = self._read_cached_tree(cache_file)
+            if cached_tree is not None:
+                print(f"Using cached dependency tree from {cache_file}")
+                return cached_tree
+
+            # Run the Maven command. Tier-1 JIT is enough for a short-lived
+            # resolve and cuts the JVM warm-up noticeably.
+            maven_opts = f"{os.environ.get('MAVEN_OPTS', '')} -XX:TieredStopAtLevel=1".strip()
+            result = subprocess.run(
+                command,
+                capture_output=True,
+                check=True,
+                env={**os.environ, 'MAVEN_OPTS': maven_opts}
+            )
+
+            # Parse the output, captured as bytes and decoded in one pass
+            tree = self._parse_project_tree_output(result.stdout.decode('utf-8'))
+            if tree != _TREE_PARSE_ERROR:
+                self._write_cached_tree(cache_file, tree)
+            return tree
+
+        except FileNotFoundError:
+            print(f"Error: Maven executable not found at '{self.mvn_executable}'.")
+            print("Please install Maven and ensure it is in your system's PATH.")
+            return None
+        except subprocess.CalledProcessError as e:
+            print(f"Error running Maven. Return code: {e.returncode}")
+            print("\n--- Maven STDOUT ---")
+            print(e.stdout.decode('utf-8', errors='replace'))
+            print("\n--- Maven STDERR ---")
+            print(e.stderr.decode('utf-8', errors='replace'))
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            return None
+
     def get_project_dependency_tree(self, project_path: str = None) -> Optional[str]:
         """
         Fetches the dependency tree for a Maven project.
@@ -106,14 +297,16 @@ class MavenDependencyAnalyzer:
         Returns:
             A string representing the dependency tree, or None on error.
         """
+        self._ensure_maven_checked()
         if project_path is None:
             project_path = os.getcwd()
 
-        pom_path = os.path.join(project_path, 'pom.xml')
+        pom = self._resolve_pom(project_path)
 
-        if not os.path.isfile(pom_path):
+        if pom is None:
             print(f"Error: 'pom.xml' not found in {project_path}", file=sys.stderr)
             return None
+        pom_path = pom[0]
 
         print(f"Fetching dependency tree for project at {pom_path}...")
 
@@ -121,36 +314,11 @@ class MavenDependencyAnalyzer:
         command = [
             self.mvn_executable,
             'dependency:tree',
+            '-B', '--no-transfer-progress',
             '-f', pom_path
         ]
 
-        try:
-            # Run the Maven command
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                check=True,
-                encoding='utf-8'
-            )
-
-            # Parse the output
-            return self._parse_project_tree_output(result.stdout)
-
-        except FileNotFoundError:
-                print(f"Error: Maven executable not found at '{self.mvn_executable}'.")
-                print("Please install Maven and ensure it is in your system's PATH.")
-                return None
-        except subprocess.CalledProcessError as e:
-                print(f"Error running Maven. Return code: {e.returncode}")
-                print("\n--- Maven STDOUT ---")
-                print(e.stdout)
-                print("\n--- Maven STDERR ---")
-                print(e.stderr)
-                return None
-        except Exception as e:
-                print(f"An unexpected error occurred: {e}")
-                return None
+        return self._run_dependency_tree(command, project_path, pom)
 
     def get_artifact_dependency_tree(self, group_id: str, artifact_id: str, project_path: str = None) -> Optional[str]:
         """
@@ -168,14 +336,16 @@ class MavenDependencyAnalyzer:
             A string representing the dependency tree for the specified
             artifact, or None on error.
         """
+        self._ensure_maven_checked()
         if project_path is None:
             project_path = os.getcwd()
 
-        pom_path = os.path.join(project_path, 'pom.xml')
+        pom = self._resolve_pom(project_path)
 
-        if not os.path.isfile(pom_path):
+        if pom is None:
             print(f"Error: 'pom.xml' not found in {project_path}", file=sys.stderr)
             return None
+        pom_path = pom[0]
 
         include_filter = f"{group_id}:{artifact_id}"
         print(f"Fetching dependency tree for artifact '{include_filter}'")
@@ -185,37 +355,88 @@ class MavenDependencyAnalyzer:
         command = [
             self.mvn_executable,
             'dependency:tree',
+            '-B', '--no-transfer-progress',
             '-f', pom_path,
             f'-Dincludes={include_filter}'
         ]
 
-        try:
-            # Run the Maven command
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                check=True,
-                encoding='utf-8'
-            )
+        return self._run_dependency_tree(command, project_path, pom, include_filter)
 
-            # We can reuse the same parser
-            return self._parse_project_tree_output(result.stdout)
+    def _split_tree_by_artifact(self, tree: str, artifacts: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[str]]:
+        """
+        Splits a tree filtered on several artifacts into one tree per artifact,
+        keeping only the lines on the paths from each root to that artifact.
+        """
+        lines = tree.splitlines()
+        kept_lines = {artifact: set() for artifact in artifacts}
+        artifacts_by_key = {f"{group_id}:{artifact_id}": (group_id, artifact_id) for group_id, artifact_id in artifacts}
+        ancestors = []
+
+        for index, line in enumerate(lines):
+            if line.startswith('[WARNING]'):
+                continue
+            # Each tree level is indented by three characters ('+- ', '|  ', ...)
+            coordinate = line.lstrip('|+\\- ')
+            depth = (len(line) - len(coordinate)) // 3
+            del ancestors[depth:]
+            ancestors.append(index)
+
+            artifact = artifacts_by_key.get(':'.join(coordinate.split(':', 2)[:2]))
+            if artifact is not None:
+                kept_lines[artifact].update(ancestors)
+
+        return {
+            artifact: "\n".join(lines[index] for index in sorted(indexes)) if indexes else None
+            for artifact, indexes in kept_lines.items()
+        }
+
+    def get_multiple_artifact_trees(self, artifacts: List[Tuple[str, str]],
+                                    project_path: str = None) -> Optional[Dict[Tuple[str, str], Optional[str]]]:
+        """
+        Fetches the dependency trees for several artifacts within a Maven project
+        using a single Maven invocation, rather than one per artifact.
 
-        except FileNotFoundError:
-                print(f"Error: Maven executable not found at '{self.mvn_executable}'.")
-                print("Please install Maven and ensure it is in your system's PATH.")
-                return None
-        except subprocess.CalledProcessError as e:
-                print(f"Error running Maven. Return code: {e.returncode}")
-                print("\n--- Maven STDOUT ---")
-                print(e.stdout)
-                print("\n--- Maven STDERR ---")
-                print(e.stderr)
-                return None
-        except Exception as e:
-                print(f"An unexpected error occurred: {e}")
-                return None
+        Args:
+            artifacts: The (Group ID, Artifact ID) pairs to filter for.
+            project_path: The file path to the project directory containing
+                          the pom.xml. If None, defaults to the
+                          current working directory.
+
+        Returns:
+            A dict mapping each (Group ID, Artifact ID) pair to its dependency
+            tree (None if it is not a dependency of the project), or None on error.
+        """
+        if not artifacts:
+            return {}
+
+        self._ensure_maven_checked()
+        if project_path is None:
+            project_path = os.getcwd()
+
+        pom = self._resolve_pom(project_path)
+
+        if pom is None:
+            print(f"Error: 'pom.xml' not found in {project_path}", file=sys.stderr)
+            return None
+        pom_path = pom[0]
+
+        include_filter = ",".join(f"{group_id}:{artifact_id}" for group_id, artifact_id in artifacts)
+        print(f"Fetching dependency trees for artifacts '{include_filter}'")
+        print(f"using project context from {pom_path}...")
+
+        # Maven accepts a comma-separated list of patterns for -Dincludes
+        command = [
+            self.mvn_executable,
+            'dependency:tree',
+            '-B', '--no-transfer-progress',
+            '-f', pom_path,
+            f'-Dincludes={include_filter}'
+        ]
+
+        tree = self._run_dependency_tree(command, project_path, pom, include_filter)
+        if tree is None or tree == _TREE_PARSE_ERROR:
+            return None
+        return self._split_tree_by_artifact(tree, artifacts)
 
 # --- Example Usage ---
 if __name__ == "__main__":
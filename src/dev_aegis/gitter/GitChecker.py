@@ -2,6 +2,22 @@ import os
 import subprocess
 import sys
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+try:
+    from prompt_toolkit.shortcuts import checkboxlist_dialog
+except ImportError:
+    checkboxlist_dialog = None
+
+# Branches that prompt for confirmation before committing on them
+_PROTECTED_BRANCHES = frozenset({'main', 'master', 'dev', 'develop'})
+
+# Remote branches checked for new commits, in report order
+_REMOTE_CHECK_BRANCHES = ('main', 'master', 'develop', 'dev')
+
 
 class GitChecker:
     """
@@ -18,7 +34,8 @@ class GitChecker:
         self.report_dir = os.path.join(self.project_root, ".dev-aegis")
         self.report_file = os.path.join(self.report_dir, "git-warning-report.md")
         self._ensure_report_directory_exists()
-        self.current_branch = self._run_git_command(['rev-parse', '--abbrev-ref', 'HEAD']).strip()
+        self._repo = self._open_repository()
+        self.current_branch = self._read_current_branch()
         if not self.current_branch:
             print("ERROR: Could not determine the current Git branch. Are you in a Git repository?")
             sys.exit(1)
@@ -33,24 +50,88 @@ class GitChecker:
             print(f"ERROR: Failed to create directory {self.report_dir}: {e}")
             sys.exit(1)
 
-    def _run_git_command(self, command, check=True):
-        """Helper to run a Git command and return its output."""
+    def _open_repository(self):
+        """
+        Opens the repository in-process with pygit2 when it is installed, so read-only
+        queries avoid spawning 'git'. Returns None to fall back to the Git CLI.
+        """
+        if pygit2 is None:
+            return None
+        try:
+            repo = pygit2.Repository(self.project_root)
+        except pygit2.GitError:
+            return None
+        # pygit2 reports paths relative to the work tree root, while the CLI works
+        # relative to the project root, so only use it when the two coincide.
+        if repo.workdir is None or not os.path.samefile(repo.workdir, self.project_root):
+            return None
+        return repo
+
+    def _read_current_branch(self):
+        """Returns the short name of the current branch ('HEAD' when detached)."""
+        if self._repo is not None and not self._repo.head_is_unborn:
+            return self._repo.head.shorthand
+        return self._run_git_command(['rev-parse', '--abbrev-ref', 'HEAD']).strip()
+
+    def _list_changed_files(self):
+        """Returns the paths of all changed and untracked files."""
+        if self._repo is not None:
+            status = self._repo.status(untracked_files='normal')
+            # Skip ignored files and staged deletions, which have nothing left to add.
+            return [
+                path for path, flags in status.items()
+                if not flags & pygit2.GIT_STATUS_IGNORED and flags != pygit2.GIT_STATUS_INDEX_DELETED
+            ]
+
+        status_output = self._run_git_command(['status', '--porcelain=v1', '-z'], raw=True)
+
+        # With '-z' every record is 'XY PATH' terminated by NUL, with paths left unquoted.
+        # A rename or copy is followed by one more record holding the original path,
+        # which is skipped so that only the new path is staged.
+        parsed_files = []
+        records = iter(status_output.split(b'\x00'))
+        for record in records:
+            if len(record) < 4:
+                continue
+            status = record[:2]
+            if status != b'D ':  # A staged deletion has nothing left to add
+                parsed_files.append(os.fsdecode(record[3:]))
+            if b'R' in status or b'C' in status:
+                next(records, None)
+        return parsed_files
+
+    def _has_staged_changes(self):
+        """Returns True if the index differs from HEAD."""
+        if self._repo is not None and not self._repo.head_is_unborn:
+            index = self._repo.index
+            index.read()  # Pick up files staged by the 'git add' subprocess
+            return len(index.diff_to_tree(self._repo.head.peel(pygit2.Tree))) > 0
+        # Plumbing compares index entries to the HEAD tree directly; it exits 1 on
+        # differences and fails outright when HEAD is unborn (no commits yet).
+        returncode = subprocess.run(['git', 'diff-index', '--cached', '--quiet', 'HEAD'],
+                                    cwd=self.project_root, stderr=subprocess.DEVNULL).returncode
+        if returncode in (0, 1):
+            return returncode == 1
+        return subprocess.run(['git', 'diff', '--cached', '--quiet'], cwd=self.project_root).returncode != 0
+
+    def _run_git_command(self, command, check=True, raw=False):
+        """Helper to run a Git command and return its output (undecoded bytes if `raw`)."""
         try:
-            result = subprocess.run(['git'] + command, capture_output=True, text=True, cwd=self.project_root, check=check, encoding='utf-8')
-            return result.stdout
+            # Output is captured as bytes and decoded once, which is cheaper for long logs
+            result = subprocess.run(['git'] + command, capture_output=True, cwd=self.project_root, check=check)
+            return result.stdout if raw else result.stdout.decode('utf-8')
         except FileNotFoundError:
             print("ERROR: 'git' command not found. Please ensure Git is installed and in your PATH.")
             sys.exit(1)
         except subprocess.CalledProcessError as e:
             print(f"ERROR: Git command failed: {' '.join(command)}")
-            print(f"STDERR:\n{e.stderr}")
+            print(f"STDERR:\n{e.stderr.decode('utf-8', errors='replace')}")
             sys.exit(1)
 
     def check_current_branch(self):
         """Warns the user if they are on a protected branch."""
-        protected_branches = ['main', 'master', 'dev', 'develop']
         print(f"INFO: Currently on branch: '{self.current_branch}'")
-        if self.current_branch in protected_branches:
+        if self.current_branch in _PROTECTED_BRANCHES:
             print(f"WARNING: You are on a protected branch ('{self.current_branch}').")
             response = input("Are you sure you want to continue? (y/n): ").lower()
             if response != 'y':
@@ -60,54 +141,62 @@ class GitChecker:
 
     def stage_files(self):
         """Interactively stages changed and untracked files."""
-        status_output = self._run_git_command(['status', '--porcelain'])
-        if not status_output:
+        parsed_files = self._list_changed_files()
+        if not parsed_files:
             print("INFO: No changes to stage.")
             return
 
-        # Parse the output of 'git status --porcelain' to get a list of file paths.
-        # This is more robust than slicing with a fixed index, which was causing trimming issues.
-        parsed_files = []
-        for line in status_output.strip().splitlines():
-            # The format is 'XY path'. We lstrip() to handle potential extra leading
-            # whitespace and split once to separate the status from the path.
-            parts = line.lstrip().split(' ', 1)
-            if len(parts) == 2:
-                file_path = parts[1]
-                # Handle renamed files ('old -> new') by taking the new path.
-                if ' -> ' in file_path:
-                    parsed_files.append(file_path.split(' -> ')[1])
-                else:
-                    parsed_files.append(file_path)
+        # Selected files are staged with a single 'git add' once the prompts are done,
+        # so the index is rewritten once rather than per file.
+        if checkboxlist_dialog is not None and sys.stdin.isatty():
+            to_stage = self._select_files_to_stage(parsed_files)
+        else:
+            to_stage = self._prompt_files_to_stage(parsed_files)
 
-        if not parsed_files:
-            print("INFO: No changes to stage.")
-            return
+        if to_stage:
+            self._run_git_command(['add', '--'] + to_stage)
+
+    def _select_files_to_stage(self, parsed_files):
+        """Lets the user pick the files to stage from a single multi-select dialog."""
+        selected = checkboxlist_dialog(
+            title="Stage files",
+            text="Select the files to stage:",
+            values=[(file_path, file_path) for file_path in parsed_files]
+        ).run()
+        if selected is None:
+            print("INFO: Quitting staging process.")
+            return []
+        for file_path in selected:
+            print(f"Staged: {file_path}")
+        return selected
 
+    def _prompt_files_to_stage(self, parsed_files):
+        """Asks the user, file by file, which files to stage."""
+        to_stage = []
         add_all = False
         for file_path in parsed_files:
             if add_all:
-                self._run_git_command(['add', file_path])
+                to_stage.append(file_path)
                 print(f"Staged: {file_path}")
                 continue
 
             response = input(f"Stage '{file_path}'? (y/n/a/q): ").lower()
             if response == 'y':
-                self._run_git_command(['add', file_path])
+                to_stage.append(file_path)
             elif response == 'a':
                 add_all = True
-                self._run_git_command(['add', file_path])
+                to_stage.append(file_path)
                 print(f"Staged: {file_path}")
             elif response == 'q':
                 print("INFO: Quitting staging process.")
                 break
             # 'n' is implicit: do nothing
 
+        return to_stage
+
     def create_commit(self):
         """Creates a commit if there are staged changes."""
-        has_staged_changes = subprocess.run(['git', 'diff', '--cached', '--quiet'], cwd=self.project_root).returncode != 0
-
-        if not has_staged_changes:
+        if not self._has_staged_changes():
             print("INFO: No changes staged for commit. Skipping commit.")
             return
 
@@ -121,20 +210,24 @@ class GitChecker:
         print("INFO: Fetching from origin to check for remote changes...")
         self._run_git_command(['fetch', 'origin'])
 
-        branches_to_check = ['main', 'master', 'develop', 'dev']
         report_content = ""
 
-        remotes = self._run_git_command(['branch', '-r'])
-        for branch in branches_to_check:
-            if f'origin/{branch}' in remotes:
-                try:
-                    log_output = self._run_git_command(['log', f'HEAD..origin/{branch}', '--oneline'], check=False)
-                    if log_output.strip():
-                        report_content += f"## New Commits on 'origin/{branch}'\n\n"
-                        report_content += "```\n" + log_output.strip() + "\n```\n\n"
-                except subprocess.CalledProcessError:
-                    print(f"WARN: Could not check branch 'origin/{branch}'.")
-                    continue
+        # List only the remote branches of interest that exist and have commits HEAD
+        # does not; when everything is up to date no 'git log' runs at all.
+        remote_refs = [f'refs/remotes/origin/{branch}' for branch in _REMOTE_CHECK_BRANCHES]
+        remotes = set(self._run_git_command(
+            ['for-each-ref', '--no-merged=HEAD', '--format=%(refname:short)'] + remote_refs
+        ).split())
+
+        # One 'git log' per such branch, so a commit reachable from several
+        # branches is reported under each of them.
+        for branch in _REMOTE_CHECK_BRANCHES:
+            if f'origin/{branch}' not in remotes:
+                continue
+            log_output = self._run_git_command(['log', f'HEAD..origin/{branch}', '--oneline'], check=False)
+            if log_output.strip():
+                report_content += f"## New Commits on 'origin/{branch}'\n\n"
+                report_content += "```\n" + log_output.strip() + "\n```\n\n"
 
         if report_content:
             final_report = "# Git Remote Changes Warning\n\n" + report_content
@@ -1,6 +1,12 @@
 import sys
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 
 class LLMInteraction:
@@ -18,13 +24,18 @@ class LLMInteraction:
         self.model = model
         self.host = host
         self.api_url = f"{self.host}/api/generate"
+        # Keep-alive session, so every prompt reuses the same connection to Ollama.
+        # Ollama serves cleartext HTTP/1.1, so an HTTP/2 client would not
+        # negotiate h2 here; the streamed lines already arrive one per chunk.
+        self._session = requests.Session()
+        self._session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
 
     def _check_server_status(self):
         """
         Checks if the Ollama server is running.
         """
         try:
-            response = requests.get(self.host, timeout=5)
+            response = self._session.get(self.host, timeout=5)
             response.raise_for_status()
             return True
         except requests.RequestException:
@@ -32,37 +43,63 @@ class LLMInteraction:
             print("Please ensure Ollama is running.")
             return False
 
-    def get_response(self, prompt):
+    def stream_response(self, prompt):
         """
-        Sends a prompt to the Ollama model and gets a response.
+        Sends a prompt to the Ollama model and yields the response as it is generated.
 
         Args:
             prompt (str): The user's prompt to send to the model.
 
-        Returns:
-            str: The model's response, or an error message if something went wrong.
+        Yields:
+            str: Successive pieces of the model's response, or an error message
+            if something went wrong.
         """
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False  # We want the full response at once
+            "stream": True  # Ollama sends one JSON object per line as tokens are generated
         }
+        # Once part of the answer has been streamed, errors start on a new line
+        # so they cannot be mistaken for the model's output.
+        error_prefix = ""
         try:
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-
-            # The response from Ollama is a JSON object
-            response_data = response.json()
-            return response_data.get('response', 'No response field in the answer.')
+            with self._session.post(self.api_url, json=payload, stream=True) as response:
+                response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = _json_loads(line)
+                    if 'error' in chunk:
+                        yield f"{error_prefix}Model error occurred: {chunk['error']}"
+                        return
+                    text = chunk.get('response', '')
+                    if text:
+                        error_prefix = "\n"
+                    yield text
 
         except requests.exceptions.HTTPError as http_err:
-            return f"HTTP error occurred: {http_err}"
+            yield f"{error_prefix}HTTP error occurred: {http_err}"
         except requests.exceptions.ConnectionError as conn_err:
-            return f"Connection error occurred: {conn_err}"
+            yield f"{error_prefix}Connection error occurred: {conn_err}"
         except requests.exceptions.Timeout as timeout_err:
-            return f"Timeout error occurred: {timeout_err}"
+            yield f"{error_prefix}Timeout error occurred: {timeout_err}"
         except requests.exceptions.RequestException as req_err:
-            return f"An unexpected error occurred: {req_err}"
+            yield f"{error_prefix}An unexpected error occurred: {req_err}"
+        except ValueError as parse_err:
+            yield f"{error_prefix}Could not parse the model's response: {parse_err}"
+
+    def get_response(self, prompt):
+        """
+        Sends a prompt to the Ollama model and gets a response.
+
+        Args:
+            prompt (str): The user's prompt to send to the model.
+
+        Returns:
+            str: The model's response, or an error message if something went wrong.
+        """
+        return "".join(self.stream_response(prompt))
 
     def start_chat(self):
         """
@@ -83,10 +120,12 @@ class LLMInteraction:
                     print("Exiting chat. Goodbye!")
                     break
 
-                print("Bot: Thinking...", end='\r')
-                response = self.get_response(prompt)
-                # Clear the "Thinking..." line and print the response
-                print(f"Bot: {response}      ")
+                # Print the response as it streams in rather than after it completes
+                sys.stdout.write("Bot: ")
+                for chunk in self.stream_response(prompt):
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                sys.stdout.write("\n")
 
             except KeyboardInterrupt:
                 print("\nExiting chat. Goodbye!")
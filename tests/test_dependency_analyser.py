@@ -0,0 +1,62 @@
+import os
+import unittest
+
+from dev_aegis.gitter import MavenDependencyAnalyzer
+
+MAVEN_OUTPUT = """\
+[INFO] Scanning for projects...
+[INFO] --- dependency:3.6.0:tree (default-cli) @ app ---
+[INFO] com.example:app:jar:1.0
+[INFO] +- org.springframework:spring-core:jar:5.3.0:compile
+[INFO] |  \\- org.yaml:snakeyaml:jar:1.33:compile
+[WARNING] Some problems were encountered while resolving the tree
+[INFO] \\- junit:junit:jar:4.13.2:test
+[INFO]    \\- org.hamcrest:hamcrest-core:jar:1.3:test
+[INFO] ------------------------------------------------------------------------
+[INFO] BUILD SUCCESS
+"""
+
+
+class SplitTreeByArtifactTest(unittest.TestCase):
+
+    def setUp(self):
+        self.analyzer = MavenDependencyAnalyzer()
+        self.tree = self.analyzer._parse_project_tree_output(MAVEN_OUTPUT)
+
+    def test_keeps_only_paths_to_each_artifact(self):
+        trees = self.analyzer._split_tree_by_artifact(
+            self.tree, [('org.yaml', 'snakeyaml'), ('org.hamcrest', 'hamcrest-core')]
+        )
+
+        self.assertEqual(
+            trees[('org.yaml', 'snakeyaml')],
+            "com.example:app:jar:1.0\n"
+            "+- org.springframework:spring-core:jar:5.3.0:compile\n"
+            "|  \\- org.yaml:snakeyaml:jar:1.33:compile"
+        )
+        self.assertEqual(
+            trees[('org.hamcrest', 'hamcrest-core')],
+            "com.example:app:jar:1.0\n"
+            "\\- junit:junit:jar:4.13.2:test\n"
+            "   \\- org.hamcrest:hamcrest-core:jar:1.3:test"
+        )
+
+    def test_missing_artifact_maps_to_none(self):
+        trees = self.analyzer._split_tree_by_artifact(self.tree, [('com.example', 'absent')])
+
+        self.assertEqual(trees, {('com.example', 'absent'): None})
+
+    def test_no_artifacts_returns_empty_dict(self):
+        self.assertEqual(self.analyzer.get_multiple_artifact_trees([]), {})
+
+    def test_cache_file_name_stays_short_for_many_artifacts(self):
+        include_filter = ",".join(f"org.example.group{i}:artifact-{i}" for i in range(20))
+
+        cache_file = self.analyzer._get_cache_file('project', 'pomhash', include_filter)
+
+        self.assertLess(len(os.path.basename(cache_file)), 255)
+        self.assertNotEqual(cache_file, self.analyzer._get_cache_file('project', 'pomhash', None))
+
+
+if __name__ == '__main__':
+    unittest.main()